@@ -1,23 +1,82 @@
 import os
+import sys
+import asyncio
 import json
+import hashlib
+import time
 import subprocess
 import re
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple, Set
+from typing import List, Dict, Iterator, Optional, Tuple, Set
 import shutil
 import requests
+from requests.adapters import HTTPAdapter
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 import argparse
 
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+try:
+    from orjson import dumps as _json_dumps, loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+    def _json_dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
+
+# Shard naming patterns, e.g. model-00001-of-00163.safetensors
+_PAT_SHARD = re.compile(r'(.*?)-(\d+)-of-(\d+)\.(safetensors|bin|pt|pth)$')
+# pytorch_model-00001.bin
+_PAT_IDX = re.compile(r'(.*?)-(\d+)\.(safetensors|bin|pt|pth)$')
+# model.safetensors.00001
+_PAT_SUFFIX = re.compile(r'(.*?)\.(safetensors|bin|pt|pth)\.(\d+)$')
+# Zero-padded index field in a filename pattern, e.g. {i:05d}
+_PAT_INDEX_FIELD = re.compile(r'\{i:0(\d+)d\}')
+
+def _write_atomic(path: Path, data: bytes):
+    """Write data to path via a temporary file so readers never see a partial file."""
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(data)
+    os.replace(tmp_path, path)
+
+def _event_loop_running() -> bool:
+    """Check if called from inside a running asyncio event loop (e.g. Jupyter)."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
 class HFModelDownloader:
-    # Weight file extensions
-    WEIGHT_EXTENSIONS = {'.safetensors', '.bin', '.pt', '.pth'}
+    # Weight file extensions, as a tuple so a single str.endswith() call checks all of them
+    WEIGHT_EXTENSIONS_TUPLE = ('.safetensors', '.bin', '.pt', '.pth')
+    WEIGHT_EXTENSIONS = set(WEIGHT_EXTENSIONS_TUPLE)
     
     # Files to ignore
     IGNORE_FILES = {
         'README.md', 'readme.md', 'LICENSE', 'license', 'LICENSE.txt', 'license.txt',
         '.gitattributes', '.gitignore', 'flax_model.msgpack', 'rust_model.ot', 'tf_model.h5'
     }
+    
+    # Filesystems where aria2 can reserve space with fallocate(2)
+    FALLOC_FILESYSTEMS = {'ext4', 'xfs', 'btrfs'}
+    # In-memory filesystems where preallocating gains nothing
+    TRUNC_FILESYSTEMS = {'tmpfs', 'ramfs'}
+    
+    # Where repository listings are cached between runs
+    CACHE_DIR = Path.home() / ".cache" / "hf_downloader"
+    
+    # Resolved CDN URLs are signed and expire; only reuse them for this many seconds
+    RESOLVED_URLS_TTL = 30 * 60
 
     def __init__(self, 
                  repo_id: str,
@@ -27,7 +86,10 @@ class HFModelDownloader:
                  start_index: Optional[int] = None,
                  max_concurrent_downloads: int = 16,
                  max_connection_per_server: int = 16,
-                 min_split_size: str = "1M"):
+                 min_split_size: str = "1M",
+                 resolve_redirects: bool = False,
+                 verbose: bool = False,
+                 quiet: bool = False):
         """
         Initialize the HuggingFace model downloader.
         
@@ -43,12 +105,29 @@ class HFModelDownloader:
             max_concurrent_downloads: Number of parallel downloads
             max_connection_per_server: Connections per server
             min_split_size: Minimum split size for parallel downloading
+            resolve_redirects: Resolve CDN redirect URLs up front instead of
+                               letting aria2 follow them
+            verbose: Print a line for every file while preparing the download
+            quiet: Run aria2 without console output; no progress is reported,
+                   the log file only records when each download starts and ends
         """
         self.repo_id = repo_id
         self.output_dir = Path(output_dir or repo_id.split('/')[-1].lower())
         self.max_concurrent_downloads = max_concurrent_downloads
         self.max_connection_per_server = max_connection_per_server
         self.min_split_size = min_split_size
+        self.resolve_redirects = resolve_redirects
+        self.verbose = verbose
+        self.quiet = quiet
+        
+        # Reuse connections to huggingface.co across all HEAD requests
+        self._session = requests.Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=32, pool_maxsize=32))
+        # HTTP/2 client for redirect lookups, created when the thread pool first needs it
+        self._client = None
+        
+        # Cached result of the single pass over the repository listing
+        self._classified = None
         
         # Get repository contents first
         self.repo_files = self._get_repo_contents()
@@ -74,59 +153,123 @@ class HFModelDownloader:
         print(f"Start index: {self.start_index}")
 
     def _get_repo_contents(self) -> Optional[List[Dict]]:
-        """Get repository file listing."""
+        """Get repository file listing, revalidating the on-disk cache by ETag.
+
+        Only single-page listings are cached: the ETag of the first page says
+        nothing about later pages.
+        """
         api_url = f"https://huggingface.co/api/models/{self.repo_id}/tree/main"
+        cache_path = self.CACHE_DIR / f"{self.repo_id.replace('/', '__')}.json"
+        etag_path = cache_path.with_suffix(".etag")
+        
+        headers = {}
+        if cache_path.exists() and etag_path.exists():
+            headers['If-None-Match'] = etag_path.read_text()
+        
         try:
-            response = requests.get(api_url)
+            response = self._session.get(api_url, headers=headers, timeout=30)
+            if response.status_code == 304:
+                print("Repository listing unchanged, using cached copy")
+                return _json_loads(cache_path.read_bytes())
             response.raise_for_status()
-            return response.json()
+            etag = response.headers.get('ETag')
+            paginated = 'next' in response.links
+            contents = list(self._iter_repo_contents(response))
         except Exception as e:
             print(f"Error fetching repository contents: {str(e)}")
             return None
+        
+        if paginated:
+            # Drop any cache from when the listing fit on one page
+            for path in (cache_path, etag_path):
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+        elif etag:
+            try:
+                cache_path.parent.mkdir(parents=True, exist_ok=True)
+                _write_atomic(cache_path, _json_dumps(contents))
+                _write_atomic(etag_path, etag.encode())
+            except OSError as e:
+                print(f"Warning: could not cache repository listing: {str(e)}")
+        return contents
+
+    def _iter_repo_contents(self, response: requests.Response) -> Iterator[Dict]:
+        """Yield tree entries page by page, following the API's Link pagination."""
+        while True:
+            yield from _json_loads(response.content)
+            next_url = response.links.get('next', {}).get('url')
+            if not next_url:
+                return
+            response = self._session.get(next_url, timeout=30)
+            response.raise_for_status()
+
+    def _create_http2_client(self):
+        """Create an HTTP/2 httpx client, or None if httpx[http2] is not installed."""
+        if httpx is None:
+            return None
+        try:
+            return httpx.Client(
+                http2=True,
+                timeout=30.0,
+                limits=httpx.Limits(max_connections=32, max_keepalive_connections=32)
+            )
+        except ImportError:
+            # httpx is installed without the h2 package
+            return None
+
+    def close(self):
+        """Close the HTTP connections held by the downloader."""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def _is_weight_file(self, filename: str) -> bool:
         """Check if a file is a model weight file."""
-        return any(filename.endswith(ext) for ext in self.WEIGHT_EXTENSIONS)
+        return filename.endswith(self.WEIGHT_EXTENSIONS_TUPLE)
 
-    def _detect_file_pattern(self) -> Tuple[Optional[str], Optional[int], Optional[int]]:
-        """Detect file pattern and count from repository contents."""
-        print(f"Detecting file pattern in {self.repo_id}...")
+    def _classify_once(self) -> Dict:
+        """Sort repository files into single weights, shard patterns and auxiliary files,
+        and record the size of every file.
+
+        The listing is traversed once and the result cached on the instance.
+        """
+        if self._classified is not None:
+            return self._classified
         
-        # First, check for single weight files
         single_weight_files = []
-        for file in self.repo_files:
-            name = file.get('path', '')
-            if self._is_weight_file(name):
-                # Check if it's a single file (not matching any shard pattern)
-                if not re.match(r'.*-\d+.*\.(safetensors|bin|pt|pth)$', name) and \
-                   not re.match(r'.*\.(safetensors|bin|pt|pth)\.\d+$', name):
-                    single_weight_files.append(name)
-        
-        # If we found single weight files, use them
-        if single_weight_files:
-            if len(single_weight_files) == 1:
-                filename = single_weight_files[0]
-                print(f"Found single weight file: {filename}")
-                # For single files, we'll use a special pattern that just returns the filename
-                return filename, 1, 0
-            else:
-                print(f"Found multiple single weight files: {single_weight_files}")
-                # Use the first one
-                filename = single_weight_files[0]
-                return filename, 1, 0
-        
-        # Group files by their pattern (for sharded models)
         patterns = defaultdict(list)
+        auxiliary_files = []
+        sizes = {}
         for file in self.repo_files:
             name = file.get('path', '')
             
-            # Skip if not a weight file
+            # LFS entries carry the real file size under 'lfs'
+            size = file.get('lfs', {}).get('size', file.get('size'))
+            if size is not None and file.get('type', '') != 'directory':
+                sizes[name] = size
+            
             if not self._is_weight_file(name):
+                # Skip ignored files and directories
+                if name in self.IGNORE_FILES or file.get('type', '') == 'directory':
+                    continue
+                # Skip large binary files that aren't weights (> 10MB)
+                if file.get('size', 0) > 10 * 1024 * 1024:
+                    continue
+                auxiliary_files.append(name)
                 continue
-                
+            
             # Try different common patterns
             # Pattern 1: model-00001-of-00163.safetensors
-            match = re.match(r'(.*?)-(\d+)-of-(\d+)\.(safetensors|bin|pt|pth)$', name)
+            match = _PAT_SHARD.match(name)
             if match:
                 prefix, idx, total, ext = match.groups()
                 pattern = f"{prefix}-{{i:0{len(idx)}d}}-of-{total}.{ext}"
@@ -134,7 +277,7 @@ class HFModelDownloader:
                 continue
                 
             # Pattern 2: pytorch_model-00001.bin
-            match = re.match(r'(.*?)-(\d+)\.(safetensors|bin|pt|pth)$', name)
+            match = _PAT_IDX.match(name)
             if match:
                 prefix, idx, ext = match.groups()
                 pattern = f"{prefix}-{{i:0{len(idx)}d}}.{ext}"
@@ -142,133 +285,340 @@ class HFModelDownloader:
                 continue
                 
             # Pattern 3: model.safetensors.00001
-            match = re.match(r'(.*?)\.(safetensors|bin|pt|pth)\.(\d+)$', name)
+            match = _PAT_SUFFIX.match(name)
             if match:
                 prefix, ext, idx = match.groups()
                 pattern = f"{prefix}.{ext}.{{i:0{len(idx)}d}}"
                 patterns[pattern].append(int(idx))
-
-        # Find the pattern with the most files
-        if not patterns:
-            return None, None, None
+                continue
             
-        best_pattern = max(patterns.items(), key=lambda x: len(x[1]))
-        pattern = best_pattern[0]
-        indices = sorted(best_pattern[1])
+            # Not matching any shard pattern, so it's a single file
+            single_weight_files.append(name)
+        
+        self._classified = {
+            'single': single_weight_files,
+            'patterns': patterns,
+            'auxiliary': auxiliary_files,
+            'sizes': sizes,
+        }
+        return self._classified
+
+    def _detect_file_pattern(self) -> Tuple[Optional[str], Optional[int], Optional[int]]:
+        """Detect file pattern and count from repository contents."""
+        print(f"Detecting file pattern in {self.repo_id}...")
+        classified = self._classify_once()
+        
+        # Prefer the pattern with the most files (for sharded models), so a
+        # stray non-sharded weight file can't hide a sharded checkpoint
+        patterns = classified['patterns']
+        if patterns:
+            best_pattern = max(patterns.items(), key=lambda x: len(x[1]))
+            pattern = best_pattern[0]
+            indices = sorted(best_pattern[1])
+            return pattern, len(indices), indices[0]
         
-        if not indices:
+        # Otherwise fall back to single weight files
+        single_weight_files = classified['single']
+        if not single_weight_files:
             return None, None, None
             
-        return pattern, len(indices), indices[0]
+        if len(single_weight_files) == 1:
+            filename = single_weight_files[0]
+            print(f"Found single weight file: {filename}")
+        else:
+            print(f"Found multiple single weight files: {single_weight_files}")
+            # Use the first one
+            filename = single_weight_files[0]
+        # For single files, we'll use a special pattern that just returns the filename
+        return filename, 1, 0
 
     def _get_auxiliary_files(self) -> List[str]:
         """Get list of auxiliary files (configs, tokenizer files, etc.)."""
-        auxiliary_files = []
-        for file in self.repo_files:
-            name = file.get('path', '')
-            
-            # Skip weight files and ignored files
-            if self._is_weight_file(name) or name in self.IGNORE_FILES:
-                continue
-                
-            # Skip directories
-            if file.get('type', '') == 'directory':
-                continue
-                
-            # Skip large binary files that aren't weights
-            size = file.get('size', 0)
-            if size > 10 * 1024 * 1024:  # Skip files > 10MB
-                continue
-                
-            auxiliary_files.append(name)
-            
-        return auxiliary_files
+        return self._classify_once()['auxiliary']
 
-    def _download_auxiliary_files(self, urls_file: str) -> Tuple[int, int]:
-        """Download auxiliary model files."""
+    def _download_auxiliary_files(self, pending: List[Tuple[str, Path]], existing_sizes: Dict[str, int]) -> Tuple[int, int]:
+        """Add auxiliary model files that still need downloading to pending."""
         existing = 0
         total = 0
         
         auxiliary_files = self._get_auxiliary_files()
-        if auxiliary_files:
+        if auxiliary_files and self.verbose:
             print("\nFound auxiliary files:")
             for name in auxiliary_files:
                 print(f"  - {name}")
         
-        with open(urls_file, 'a') as f:
-            for name in auxiliary_files:
-                output_path = self.output_dir / name
-                total += 1
-                
-                if output_path.exists():
-                    existing += 1
+        for name in auxiliary_files:
+            output_path = self.output_dir / name
+            total += 1
+            
+            if self._is_complete(name, existing_sizes):
+                existing += 1
+                if self.verbose:
                     print(f"Skipping {name} - already exists")
-                    continue
-                
-                url = self.get_file_url(name)
-                if url:
-                    print(f"Adding auxiliary file: {name}")
-                    f.write(f"{url}\n")
-                    f.write(f"  out={output_path}\n")
+                continue
+            if self.verbose:
+                print(f"Adding auxiliary file: {name}")
+            pending.append((name, output_path))
         
         return existing, total
 
+    def _canonical_url(self, filename: str) -> str:
+        """Get the huggingface.co resolve URL for a file."""
+        return f"https://huggingface.co/{self.repo_id}/resolve/main/{filename}"
+
     def get_file_url(self, filename: str) -> Optional[str]:
         """Get the direct download URL for a file from HuggingFace."""
-        url = f"https://huggingface.co/{self.repo_id}/resolve/main/{filename}"
-        print(f"Getting redirect URL for: {url}")
+        url = self._canonical_url(filename)
+        if self._client is not None:
+            try:
+                response = self._client.head(url, follow_redirects=True)
+            except httpx.HTTPError as e:
+                print(f"Error resolving {filename}: {str(e)}")
+                return None
+            return str(response.url) if response.is_success else None
         
-        cmd = ["curl", "-I", "-L", url]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        urls = re.findall(r'location: (.*?)$', result.stdout, re.MULTILINE)
-        if urls:
-            return urls[-1].strip()
-        return None
+        try:
+            response = self._session.head(url, allow_redirects=True, timeout=30)
+        except requests.RequestException as e:
+            print(f"Error resolving {filename}: {str(e)}")
+            return None
+        return response.url if response.ok else None
+
+    def _resolve_urls(self, filenames: List[str]) -> List[Optional[str]]:
+        """Resolve download URLs for several files concurrently, preserving order."""
+        if not self.resolve_redirects:
+            # aria2 follows the redirect to the CDN itself
+            return [self._canonical_url(filename) for filename in filenames]
+        if not filenames:
+            return []
+        print(f"Resolving download URLs for {len(filenames)} files...")
+        if aiohttp is not None and not _event_loop_running():
+            urls = asyncio.run(self._resolve_all(filenames))
+        else:
+            if self._client is None:
+                # HTTP/2 multiplexes the lookups over one connection, if available
+                self._client = self._create_http2_client()
+            urls = []
+            with ThreadPoolExecutor(max_workers=self.max_concurrent_downloads) as executor:
+                for url in executor.map(self.get_file_url, filenames):
+                    urls.append(url)
+                    self._report_progress(len(urls), len(filenames))
+        print(f"Resolved {sum(1 for url in urls if url)} URLs")
+        return urls
+
+    def _report_progress(self, done: int, total: int):
+        """Write URL resolution progress to stderr every 50 files."""
+        if done % 50 == 0:
+            sys.stderr.write(f"  resolved {done}/{total}\n")
+            sys.stderr.flush()
+
+    async def _resolve_all(self, filenames: List[str]) -> List[Optional[str]]:
+        """Resolve download URLs on one aiohttp session, preserving order."""
+        connector = aiohttp.TCPConnector(limit=32)
+        # No total timeout: it would include time queued for a free connection
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=30, sock_read=30)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            # Shared by all _head calls; they run on one event loop thread
+            progress = {'done': 0, 'total': len(filenames)}
+            return await asyncio.gather(*(self._head(session, filename, progress) for filename in filenames))
+
+    async def _head(self, session, filename: str, progress: Dict[str, int]) -> Optional[str]:
+        """Get the direct download URL for a file using an aiohttp session."""
+        try:
+            async with session.head(self._canonical_url(filename), allow_redirects=True) as response:
+                url = str(response.url) if response.ok else None
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            print(f"Error resolving {filename}: {str(e)}")
+            url = None
+        progress['done'] += 1
+        self._report_progress(progress['done'], progress['total'])
+        return url
 
-    def generate_filenames(self) -> List[str]:
-        """Generate list of filenames based on the pattern."""
+    def generate_filenames(self) -> Iterator[str]:
+        """Generate filenames based on the pattern."""
         # If pattern is a single filename (not a format string), return it directly
         if not self.pattern or '{' not in self.pattern:
-            return [self.pattern] if self.pattern else []
+            if self.pattern:
+                yield self.pattern
+            return
+        
+        indices = range(self.start_index, self.start_index + self.num_files)
+        
+        # Patterns made only of {i:0Nd} fields are rendered with %-formatting,
+        # which is cheaper than str.format for padded integers
+        template, fields = _PAT_INDEX_FIELD.subn(r'%0\1d', self.pattern.replace('%', '%%'))
+        if '{' not in template and '}' not in template:
+            for i in indices:
+                yield template % ((i,) * fields)
+            return
         
         # For sharded models, use the format pattern
-        return [self.pattern.format(i=i, total=self.num_files) 
-                for i in range(self.start_index, self.start_index + self.num_files)]
+        for i in indices:
+            yield self.pattern.format(i=i, total=self.num_files)
+
+    def _scan_output_dir(self, filenames: List[str]) -> Dict[str, int]:
+        """Map files already in output_dir (relative, '/'-separated) to their sizes.
+
+        Only the directories holding the requested filenames are listed, one
+        os.scandir call each; subdirectories are not descended into.
+        """
+        sizes = {}
+        directories = {filename.rpartition('/')[0] for filename in filenames}
+        for directory in directories:
+            prefix = directory + '/' if directory else ''
+            try:
+                entries = os.scandir(self.output_dir / directory)
+            except OSError:
+                # Directory not created yet, nothing downloaded there
+                continue
+            with entries:
+                for entry in entries:
+                    try:
+                        # Skips directories and dangling symlinks
+                        if not entry.is_file():
+                            continue
+                        sizes[prefix + entry.name] = entry.stat().st_size
+                    except OSError:
+                        continue
+        return sizes
+
+    def _is_complete(self, filename: str, existing_sizes: Dict[str, int]) -> bool:
+        """Check if a file is fully downloaded, i.e. exists with the size listed in the repository.
+
+        Only files with a .aria2 control file are partial downloads for aria2 to
+        resume (aria2 preallocates the full length, so their size may already
+        match). Any other file of the wrong size is stale or corrupt and is
+        deleted, so aria2 downloads it from scratch instead of appending to it.
+        """
+        if filename not in existing_sizes or filename + '.aria2' in existing_sizes:
+            return False
+        expected = self._classify_once()['sizes'].get(filename)
+        if expected is None or existing_sizes[filename] == expected:
+            return True
+        
+        print(f"Removing {filename}: size {existing_sizes[filename]} does not match {expected}")
+        try:
+            (self.output_dir / filename).unlink()
+        except OSError as e:
+            print(f"Warning: could not remove {filename}: {str(e)}")
+        return False
+
+    def _manifest_hash(self) -> str:
+        """Hash the repository listing and the settings that shape the aria2 input file."""
+        digest = hashlib.blake2b(_json_dumps(self.repo_files))
+        settings = [self.repo_id, self.pattern, self.num_files, self.start_index,
+                    str(self.output_dir), self.resolve_redirects]
+        digest.update(_json_dumps(settings))
+        return digest.hexdigest()
+
+    def _load_resolved_urls(self, urls_path: Path, hash_path: Path, manifest_hash: str) -> Optional[Dict[str, str]]:
+        """Load output path -> URL from a previous aria2 input file of resolved URLs.
+
+        Returns None unless the file was resolved from the same listing and
+        settings (manifest_hash) within RESOLVED_URLS_TTL.
+        """
+        try:
+            if time.time() - hash_path.stat().st_mtime > self.RESOLVED_URLS_TTL:
+                return None
+            if hash_path.read_text() != manifest_hash:
+                return None
+            content = urls_path.read_text(encoding="utf-8")
+        except OSError:
+            return None
+        
+        resolved = {}
+        url = None
+        for line in content.splitlines():
+            if line.startswith("  out="):
+                if url:
+                    resolved[line[len("  out="):]] = url
+            else:
+                url = line
+        return resolved
 
     def generate_aria2_input(self, urls_file: str = "aria2_urls.txt") -> Tuple[int, int]:
         """Generate aria2 input file with URLs and output paths."""
         self.output_dir.mkdir(parents=True, exist_ok=True)
         
+        weight_files = list(self.generate_filenames())
+        existing_sizes = self._scan_output_dir(weight_files + self._get_auxiliary_files())
+        
         # First, handle weight files
         existing_files = 0
         total_files = 0
         
-        with open(urls_file, 'w') as f:
-            for filename in self.generate_filenames():
-                output_path = self.output_dir / filename
-                total_files += 1
-                
-                if output_path.exists():
-                    existing_files += 1
+        pending = []
+        for filename in weight_files:
+            output_path = self.output_dir / filename
+            total_files += 1
+            
+            if self._is_complete(filename, existing_sizes):
+                existing_files += 1
+                if self.verbose:
                     print(f"Skipping {filename} - already exists")
-                    continue
-                
-                url = self.get_file_url(filename)
-                if url:
-                    f.write(f"{url}\n")
-                    f.write(f"  out={output_path}\n")
+                continue
+            pending.append((filename, output_path))
+        
+        # Start the largest files first so no download slot idles at the end
+        sizes = self._classify_once()['sizes']
+        pending.sort(key=lambda item: -sizes.get(item[0], 0))
         
         # Then, add auxiliary files
-        existing_aux, total_aux = self._download_auxiliary_files(urls_file)
+        existing_aux, total_aux = self._download_auxiliary_files(pending, existing_sizes)
         
-        return (existing_files + existing_aux, total_files + total_aux)
+        # Resolving redirects costs a request per file, so reuse recently
+        # resolved URLs from the previous input file if the listing is unchanged
+        urls_path = Path(urls_file)
+        hash_path = urls_path.with_name(urls_path.name + ".hash")
+        resolved = None
+        if self.resolve_redirects:
+            manifest_hash = self._manifest_hash()
+            resolved = self._load_resolved_urls(urls_path, hash_path, manifest_hash)
+        
+        if resolved is not None and all(str(output_path) in resolved for _, output_path in pending):
+            print(f"Repository unchanged, reusing resolved URLs from {urls_file}")
+            urls = [resolved[str(output_path)] for _, output_path in pending]
+        else:
+            urls = self._resolve_urls([filename for filename, _ in pending])
+            if self.resolve_redirects:
+                # Its mtime records when the URLs were resolved
+                _write_atomic(hash_path, manifest_hash.encode())
+            else:
+                try:
+                    hash_path.unlink()
+                except FileNotFoundError:
+                    pass
+        
+        # Only list files still pending, so aria2 gets exactly what is reported
+        lines = []
+        for (filename, output_path), url in zip(pending, urls):
+            if url:
+                lines.append(f"{url}\n  out={output_path}\n")
+        _write_atomic(urls_path, ''.join(lines).encode())
+        
+        existing, total = existing_files + existing_aux, total_files + total_aux
+        print(f"{total} files in repository, {existing} already downloaded")
+        return (existing, total)
 
     def generate_aria2_command(self, 
                              urls_file: str = "aria2_urls.txt",
                              log_file: str = "aria2_download.log") -> List[str]:
         """Generate aria2c command with optimal parameters."""
-        return [
+        if self.quiet:
+            # No console repainting and no progress readout; the log file only
+            # records when each download starts and finishes
+            console_options = [
+                "--console-log-level=warn",
+                "--summary-interval=0",
+                "--quiet=true"
+            ]
+        else:
+            console_options = [
+                "--console-log-level=notice",
+                "--summary-interval=1",
+                "--show-console-readout=true"
+            ]
+        cmd = [
             "aria2c",
             "--input-file", urls_file,
             "--max-concurrent-downloads", str(self.max_concurrent_downloads),
@@ -276,20 +626,60 @@ class HFModelDownloader:
             "--min-split-size", self.min_split_size,
             "--auto-file-renaming=false",
             "--continue=true",
+            "--check-certificate=true",
             "--log", log_file,
             "--log-level=notice",
-            "--console-log-level=notice",
-            "--summary-interval=1",
-            "--show-console-readout=true",
-            "--download-result=full"
+            *console_options,
+            "--download-result=full",
+            "--disk-cache=64M",
+            "--piece-length=1M",
+            "--optimize-concurrent-downloads=true"
         ]
+        file_allocation = self._file_allocation()
+        if file_allocation:
+            cmd.append(f"--file-allocation={file_allocation}")
+        return cmd
+
+    def _file_allocation(self) -> Optional[str]:
+        """Pick aria2's file allocation method for the filesystem holding output_dir.
+
+        falloc reserves each file as a single extent on filesystems supporting
+        fallocate(2); tmpfs/ramfs use trunc. Returns None to keep aria2's
+        default (prealloc) when the filesystem type is unknown.
+        """
+        try:
+            with open("/proc/mounts") as f:
+                mounts = [line.split()[1:3] for line in f]
+        except OSError:
+            return None
+        
+        # The mount point with the longest matching prefix holds output_dir
+        path = str(self.output_dir.resolve())
+        fs_type = None
+        best = -1
+        for mount_point, mount_type in mounts:
+            mount_point = mount_point.replace("\\040", " ")
+            prefix = mount_point.rstrip('/') + '/'
+            if (path == mount_point or path.startswith(prefix)) and len(mount_point) > best:
+                fs_type, best = mount_type, len(mount_point)
+        if fs_type in self.FALLOC_FILESYSTEMS:
+            return "falloc"
+        if fs_type in self.TRUNC_FILESYSTEMS:
+            return "trunc"
+        return None
 
     def check_aria2_installed(self) -> bool:
         """Check if aria2 is installed."""
         return shutil.which("aria2c") is not None
 
-    def start_download(self) -> bool:
-        """Start the download process using aria2."""
+    def start_download(self, replace_process: bool = False) -> bool:
+        """Start the download process using aria2.
+        
+        Args:
+            replace_process: Replace the Python process with aria2c via os.execvp
+                             instead of waiting on a subprocess. Only returns if
+                             there is nothing to download.
+        """
         if not self.check_aria2_installed():
             print("Error: aria2c is not installed. Please install it first.")
             return False
@@ -306,6 +696,15 @@ class HFModelDownloader:
         cmd = self.generate_aria2_command()
         print(f"Running command: {' '.join(cmd)}")
         
+        if replace_process:
+            sys.stdout.flush()
+            self.close()
+            try:
+                os.execvp(cmd[0], cmd)
+            except OSError as e:
+                print(f"Error starting aria2c: {str(e)}")
+                return False
+        
         try:
             result = subprocess.run(cmd)
             return result.returncode == 0
@@ -326,6 +725,10 @@ def main():
     parser.add_argument("--max-concurrent", type=int, default=16, help="Maximum concurrent downloads (default: 16)")
     parser.add_argument("--max-connections", type=int, default=16, help="Maximum connections per server (default: 16)")
     parser.add_argument("--min-split-size", default="1M", help="Minimum split size (default: 1M)")
+    parser.add_argument("--resolve-redirects", action="store_true", help="Resolve CDN redirect URLs before starting aria2")
+    parser.add_argument("--verbose", action="store_true", help="Print every file while preparing the download")
+    parser.add_argument("--quiet", action="store_true", help="Disable aria2 console output, including progress")
+    parser.add_argument("--exec", action="store_true", help="Replace this process with aria2c instead of running it as a child")
     
     args = parser.parse_args()
     
@@ -338,10 +741,13 @@ def main():
         start_index=args.start_index,
         max_concurrent_downloads=args.max_concurrent,
         max_connection_per_server=args.max_connections,
-        min_split_size=args.min_split_size
+        min_split_size=args.min_split_size,
+        resolve_redirects=args.resolve_redirects,
+        verbose=args.verbose,
+        quiet=args.quiet
     )
     
-    success = downloader.start_download()
+    success = downloader.start_download(replace_process=args.exec)
     if success:
         print("\nDownload completed successfully!")
     else: